@@ -0,0 +1,82 @@
+# bench_import.py
+"""
+Import-time benchmark for the CLI / worker entry module.
+
+Runs `python -X importtime -c "import <module>"` in fresh interpreters and reports the
+median total import time, the slowest top-level imports, and whether any of the heavy
+extraction/rendering modules leaked into import time.
+
+    uv run python bench_import.py                # default: deep_research_system
+    uv run python bench_import.py tools --runs 9
+
+Exit code is 1 if the median exceeds IMPORT_BUDGET_MS or a deferred module is imported.
+"""
+from __future__ import annotations
+import argparse, os, statistics, subprocess, sys
+
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "1500"))
+
+# These must only load on first use (see tools.py / report_writer.py).
+# rich is deferred in progress.py too, but the Agents SDK already imports it via mcp.
+DEFERRED_MODULES = ("trafilatura", "pypdf", "bs4", "lxml", "jinja2")
+
+
+def _importtime(module: str) -> list[tuple[int, int, str]]:
+    """Return (self_us, cumulative_us, name) rows; name keeps its indentation."""
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="0")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env,
+    )
+    if proc.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{proc.stderr[-2000:]}")
+    rows: list[tuple[int, int, str]] = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cum_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((int(self_us), int(cum_us), name.rstrip()))
+    return rows
+
+
+def _depth(name: str) -> int:
+    # importtime indents nested imports by two spaces per level after a single leading space
+    return (len(name) - len(name.lstrip()) - 1) // 2
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("module", nargs="?", default="deep_research_system")
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--top", type=int, default=10)
+    args = ap.parse_args()
+
+    _importtime(args.module)  # warm the bytecode cache so runs compare like for like
+    totals: list[float] = []
+    rows: list[tuple[int, int, str]] = []
+    for _ in range(args.runs):
+        rows = _importtime(args.module)
+        totals.append(sum(cum for _, cum, name in rows if _depth(name) == 0) / 1000)
+
+    median = statistics.median(totals)
+    print(f"import {args.module}: median {median:.0f} ms over {args.runs} runs "
+          f"(min {min(totals):.0f}, max {max(totals):.0f}); budget {IMPORT_BUDGET_MS:.0f} ms")
+
+    print(f"\nslowest direct imports of {args.module} (last run):")
+    direct = [r for r in rows if _depth(r[2]) == 1]
+    top = sorted(direct, key=lambda r: r[1], reverse=True)
+    for _, cum, name in top[: args.top]:
+        print(f"  {cum / 1000:8.1f} ms  {name.strip()}")
+
+    loaded = {name.strip().split(".")[0] for _, _, name in rows}
+    leaked = [m for m in DEFERRED_MODULES if m in loaded]
+    if leaked:
+        print(f"\ndeferred modules imported eagerly: {', '.join(leaked)}")
+
+    ok = median <= IMPORT_BUDGET_MS and not leaked
+    print("\nOK" if ok else "\nOVER BUDGET")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+# bench_pool.py
+"""
+Connection-pool throughput bench for the LLM client transport (sdk.build_http_client).
+
+Starts a local OpenAI-compatible stub (/v1/chat/completions, fixed latency, HTTP/1.1
+keep-alive) in a child process, then fires a burst of concurrent chat completions through
+an AsyncOpenAI client for each pool size and reports throughput and latency percentiles.
+Throughput grows with pool size until the client (or, on small machines, the shared CPU)
+saturates; past that point extra connections only add contention.
+
+    uv run python bench_pool.py
+    uv run python bench_pool.py --pools 1,4,16,64 --requests 400 --concurrency 128 --latency-ms 100
+
+The stub speaks cleartext HTTP/1.1 only, so LLM_HTTP2 has no effect here; HTTP/2
+multiplexing only applies against TLS endpoints that negotiate h2.
+"""
+from __future__ import annotations
+import argparse, asyncio, json, statistics, subprocess, sys, time
+
+from openai import AsyncOpenAI
+
+from sdk import build_http_client, llm_timeout
+
+_COMPLETION = {
+    "id": "chatcmpl-bench",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "stub",
+    "choices": [{
+        "index": 0,
+        "finish_reason": "stop",
+        "message": {"role": "assistant", "content": "ok"},
+    }],
+    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+}
+
+
+async def _stub_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter, latency: float) -> None:
+    body = json.dumps(_COMPLETION).encode()
+    try:
+        while True:  # keep-alive: serve requests until the client closes
+            request_line = await reader.readline()
+            if not request_line:
+                break
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                k, _, v = line.decode("latin-1").partition(":")
+                if k.strip().lower() == "content-length":
+                    length = int(v.strip())
+            if length:
+                await reader.readexactly(length)
+            await asyncio.sleep(latency)  # simulated model time
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                + f"Content-Length: {len(body)}\r\n\r\n".encode() + body
+            )
+            await writer.drain()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _run_pool(base_url: str, pool_size: int, requests: int, concurrency: int) -> dict:
+    client = AsyncOpenAI(
+        api_key="bench",
+        base_url=base_url,
+        http_client=build_http_client(pool_size=pool_size),
+        timeout=llm_timeout(),
+        max_retries=0,
+    )
+    gate = asyncio.Semaphore(concurrency)
+    latencies: list[float] = []
+
+    async def one() -> None:
+        async with gate:
+            started = time.perf_counter()
+            await client.chat.completions.create(model="stub", messages=[{"role": "user", "content": "hi"}])
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[one() for _ in range(requests)])
+    elapsed = time.perf_counter() - started
+    await client.close()
+    latencies.sort()
+    return {
+        "pool": pool_size,
+        "req_s": requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p95_ms": latencies[int(0.95 * (len(latencies) - 1))] * 1000,
+    }
+
+
+async def _serve_stub(latency: float) -> None:
+    server = await asyncio.start_server(lambda r, w: _stub_connection(r, w, latency), "127.0.0.1", 0)
+    print(server.sockets[0].getsockname()[1], flush=True)  # parent reads the port
+    async with server:
+        await server.serve_forever()
+
+
+async def main(args: argparse.Namespace) -> None:
+    # separate process so the stub doesn't compete with the client for one event loop
+    stub = subprocess.Popen(
+        [sys.executable, __file__, "--stub", "--latency-ms", str(args.latency_ms)],
+        stdout=subprocess.PIPE, text=True,
+    )
+    try:
+        port = int(stub.stdout.readline())
+        base_url = f"http://127.0.0.1:{port}/v1"
+        print(f"stub latency {args.latency_ms:.0f} ms, {args.requests} requests, concurrency {args.concurrency}")
+        print(f"{'pool':>6} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9}")
+        for pool in (int(p) for p in args.pools.split(",")):
+            r = await _run_pool(base_url, pool, args.requests, args.concurrency)
+            print(f"{r['pool']:>6} {r['req_s']:>9.1f} {r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f}")
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="LLM client connection-pool bench")
+    ap.add_argument("--pools", default="1,2,4,8,16,32,64")
+    ap.add_argument("--requests", type=int, default=200)
+    ap.add_argument("--concurrency", type=int, default=64)
+    ap.add_argument("--latency-ms", type=float, default=50)
+    ap.add_argument("--stub", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.stub:
+        asyncio.run(_serve_stub(args.latency_ms / 1000))
+    else:
+        asyncio.run(main(args))
@@ -0,0 +1,194 @@
+# budget.py
+"""
+Per-run budgets: tokens, LLM calls, page fetches and a wall-clock deadline.
+
+run_deep_research_impl creates one RunBudget per call and hands each stage / subtask a
+share of what is left. Usage is charged to the active budget (a context variable) and to
+every parent, so a subtask can never spend more than the run has left.
+Limits of 0 mean unlimited.
+"""
+from __future__ import annotations
+import os, time, contextvars
+from collections.abc import Iterable
+from contextlib import contextmanager
+
+from agents import AgentHooks
+
+RUN_TOKEN_BUDGET = int(os.getenv("RUN_TOKEN_BUDGET", "0"))
+RUN_LLM_CALL_BUDGET = int(os.getenv("RUN_LLM_CALL_BUDGET", "0"))
+RUN_FETCH_BUDGET = int(os.getenv("RUN_FETCH_BUDGET", "0"))
+RUN_DEADLINE_S = float(os.getenv("RUN_DEADLINE_S", "0"))
+RUN_RESEARCH_SHARE = float(os.getenv("RUN_RESEARCH_SHARE", "0.6"))  # rest is kept for synthesis + summary
+
+_CURRENT: contextvars.ContextVar[RunBudget | None] = contextvars.ContextVar("run_budget", default=None)
+
+
+class BudgetExceeded(Exception):
+    """Raised before an LLM call once the active budget is spent."""
+
+
+class RunBudget:
+    def __init__(
+        self,
+        tokens: int = 0,
+        llm_calls: int = 0,
+        fetches: int = 0,
+        deadline_s: float = 0,
+        name: str = "run",
+        parent: RunBudget | None = None,
+    ):
+        self.name = name
+        self.parent = parent
+        self.limits = {"tokens": tokens, "llm_calls": llm_calls, "fetches": fetches}
+        # limited kinds, plus the input/cached/output split of tokens for reporting
+        self.used = {"tokens": 0, "llm_calls": 0, "fetches": 0,
+                     "input_tokens": 0, "cached_tokens": 0, "output_tokens": 0}
+        self.deadline = time.monotonic() + deadline_s if deadline_s else None
+        self.notes: list[str] = []  # what was skipped or cut short (run-level only)
+
+    @classmethod
+    def from_env(cls, deadline_s: float | None = None) -> RunBudget:
+        """RUN_* limits; `deadline_s` applies when RUN_DEADLINE_S is unset."""
+        return cls(RUN_TOKEN_BUDGET, RUN_LLM_CALL_BUDGET, RUN_FETCH_BUDGET, RUN_DEADLINE_S or deadline_s or 0)
+
+    # ---------- queries ----------
+    def remaining(self, kind: str) -> float:
+        """Units of `kind` left here and in every parent; inf if unlimited."""
+        left = float("inf")
+        if self.limits[kind]:
+            left = self.limits[kind] - self.used[kind]
+        if self.parent is not None:
+            left = min(left, self.parent.remaining(kind))
+        return max(left, 0)
+
+    def remaining_s(self) -> float | None:
+        """Seconds to the nearest deadline in the chain; None if there is none."""
+        own = self.deadline - time.monotonic() if self.deadline is not None else None
+        up = self.parent.remaining_s() if self.parent is not None else None
+        left = [t for t in (own, up) if t is not None]
+        return max(min(left), 0.0) if left else None
+
+    def exhausted(self) -> str | None:
+        """Reason string if any limit or deadline in the chain is spent, else None."""
+        for kind in self.limits:
+            if self.remaining(kind) <= 0:
+                return f"{kind} budget spent"
+        left = self.remaining_s()
+        if left is not None and left <= 0:
+            return "deadline reached"
+        return None
+
+    # ---------- accounting ----------
+    def charge(self, **amounts: int) -> None:
+        """Add e.g. tokens=, llm_calls=, fetches=, cached_tokens= here and in every parent."""
+        node: RunBudget | None = self
+        while node is not None:
+            for kind, n in amounts.items():
+                node.used[kind] += n
+            node = node.parent
+
+    def try_fetch(self) -> bool:
+        if self.remaining("fetches") < 1:
+            return False
+        self.charge(fetches=1)
+        return True
+
+    def unspent(self, kind: str) -> float:
+        """Own allowance of `kind` not used yet (ignores parents); inf if unlimited."""
+        if not self.limits[kind]:
+            return float("inf")
+        return max(self.limits[kind] - self.used[kind], 0)
+
+    def share(
+        self,
+        name: str,
+        fraction: float,
+        time_fraction: float | None = None,
+        held: Iterable[RunBudget] = (),
+    ) -> RunBudget:
+        """
+        Child budget with `fraction` of what is left of each limit and `time_fraction`
+        (default: `fraction`) of the time left. Unlimited stays unlimited.
+        `held` are sibling shares still running: their unspent allowance is already
+        promised, so it is taken off what is left before the fraction is applied.
+        """
+        held = list(held)
+        child = RunBudget(name=name, parent=self)
+        for kind in self.limits:
+            left = self.remaining(kind)
+            if left != float("inf"):
+                left -= sum(h.unspent(kind) for h in held if h.unspent(kind) != float("inf"))
+                child.limits[kind] = max(int(max(left, 0) * fraction), 1)
+        left_s = self.remaining_s()
+        if left_s is not None:
+            child.deadline = time.monotonic() + left_s * (fraction if time_fraction is None else time_fraction)
+        return child
+
+    def note(self, text: str) -> None:
+        root = self
+        while root.parent is not None:
+            root = root.parent
+        root.notes.append(text)
+
+    def snapshot(self) -> dict:
+        left_s = self.remaining_s()
+        return {
+            "limits": {k: v or None for k, v in self.limits.items()},
+            "used": dict(self.used),
+            "seconds_left": round(left_s, 1) if left_s is not None else None,
+            "notes": list(self.notes),
+        }
+
+
+def current_budget() -> RunBudget | None:
+    return _CURRENT.get()
+
+
+@contextmanager
+def use_budget(budget: RunBudget):
+    """Make `budget` the one charged by LLM calls and fetches in this context."""
+    token = _CURRENT.set(budget)
+    try:
+        yield budget
+    finally:
+        _CURRENT.reset(token)
+
+
+class BudgetHooks(AgentHooks):
+    """Refuses LLM calls once the active budget is spent and charges each response's usage."""
+
+    async def on_llm_start(self, context, agent, system_prompt, input_items) -> None:
+        budget = current_budget()
+        if budget is None:
+            return
+        reason = budget.exhausted()
+        if reason:
+            raise BudgetExceeded(f"{budget.name}: {reason}")
+
+    async def on_llm_end(self, context, agent, response) -> None:
+        budget = current_budget()
+        if budget is not None:
+            usage = response.usage
+            budget.charge(
+                tokens=usage.total_tokens,
+                llm_calls=1,
+                input_tokens=usage.input_tokens,
+                cached_tokens=usage.input_tokens_details.cached_tokens or 0,
+                output_tokens=usage.output_tokens,
+            )
+
+
+BUDGET_HOOKS = BudgetHooks()
+
+
+if __name__ == "__main__":
+    # self-check: subtasks that start together get equal shares (up to integer rounding)
+    for tokens, calls in ((10_000, 40), (5_999, 23)):
+        research = RunBudget(tokens=tokens, llm_calls=calls)
+        running: list[RunBudget] = []
+        for i, pending in enumerate(range(4, 0, -1)):
+            running.append(research.share(f"task {i + 1}", 1 / pending, held=running))
+        for kind in ("tokens", "llm_calls"):
+            limits = [b.limits[kind] for b in running]
+            assert max(limits) - min(limits) <= 1 and sum(limits) <= research.limits[kind], (kind, limits)
+            print(f"concurrent {kind} shares of {research.limits[kind]}: {limits}")
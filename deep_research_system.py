@@ -1,17 +1,19 @@
 # deep_research_system.py
 from __future__ import annotations
-import os, sys, datetime as dt, asyncio, re
+import os, sys, datetime as dt, asyncio, re, time, math, functools
+from typing import Awaitable, Callable
 from dotenv import load_dotenv
-from rich import print
-from rich.panel import Panel
-
-from agents import Agent, Runner, function_tool, trace, custom_span
+from openai.types.responses import ResponseTextDeltaEvent
+from agents import Agent, Runner, function_tool, trace, custom_span, MaxTurnsExceeded
 from sdk import model_smart
 from planning_agent import build_planner
 from research_agents import build_fact_finder, build_source_checker, build_analyst
-from synthesis_agent import build_synthesizer
+from synthesis_agent import build_synthesizer, build_summarizer, SYNTH_TASK, SUMMARY_TASK
 from report_writer import render_markdown
-from guardrails import input_guardrail, output_guardrail
+from guardrails import input_guardrail, output_guardrail, gate_question, QuestionBlocked
+from progress import Progress
+from router import route_listener
+from budget import RunBudget, BudgetExceeded, BUDGET_HOOKS, RUN_RESEARCH_SHARE, current_budget, use_budget
 from tools import web_search_impl  # <-- use impl for Python-side fallback
 
 
@@ -30,20 +32,48 @@ load_dotenv()
 MAX_CONCURRENCY = int(os.getenv("MAX_CONCURRENCY", "1"))
 MAX_RETRIES = int(os.getenv("AGENT_RETRIES", "4"))
 BASE_RETRY_DELAY = float(os.getenv("AGENT_RETRY_BASE", "2.0"))
-
-# ---------- Build sub-agents ----------
-PLANNER = build_planner()
-FACTFINDER = build_fact_finder()
-CHECKER   = build_source_checker()
-ANALYST   = build_analyst()
-SYNTH     = build_synthesizer()
-
-# ---------- Handoff chain (FF -> CHECKER -> ANALYST) ----------
-FACTFINDER.handoffs = [CHECKER]
-CHECKER.handoffs    = [ANALYST]
-# ANALYST ends the chain
+MAX_TURNS = int(os.getenv("AGENT_MAX_TURNS", "10"))  # bounds tool-call loops and handoff chains per run
+
+# ---------- Build sub-agents (on first use, not at import) ----------
+_AGENT_NAMES = ("PLANNER", "FACTFINDER", "CHECKER", "ANALYST", "SYNTH", "SUMMARY")
+
+@functools.cache
+def get_agents() -> dict[str, Agent]:
+    built = {
+        "PLANNER":    build_planner(),
+        "FACTFINDER": build_fact_finder(),
+        "CHECKER":    build_source_checker(),
+        "ANALYST":    build_analyst(),
+        "SYNTH":      build_synthesizer(),
+        "SUMMARY":    build_summarizer(),
+    }
+    # ---------- Handoff chain (FF -> CHECKER -> ANALYST) ----------
+    built["FACTFINDER"].handoffs = [built["CHECKER"]]
+    built["CHECKER"].handoffs    = [built["ANALYST"]]
+    # ANALYST ends the chain
+    for agent in built.values():
+        agent.hooks = BUDGET_HOOKS  # charge usage to / stop at the active run budget
+    return built
+
+def __getattr__(name: str):
+    # keep `deep_research_system.PLANNER` etc. working without building agents at import
+    if name in _AGENT_NAMES:
+        return get_agents()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # ---------- Helpers ----------
+def _context_block(question: str, findings: str | None = None) -> str:
+    """
+    Run-stable head of every stage input: the question, then the shared findings.
+    Stage-specific text always goes after it, so calls within a run share a prefix
+    the provider can serve from its prompt cache.
+    """
+    block = f"QUESTION:\n{question}\n\n"
+    if findings is not None:
+        block += f"VERIFIED FINDINGS / ANALYSES:\n{findings}\n\n"
+    return block
+
+SKIPPED_SECTION = "_(skipped: run budget reached — see Limitations and Analysis & Discussion)_"
 URL_RE = re.compile(r"https?://[^\s)>\]]+", re.IGNORECASE)
 
 def extract_urls_from_text(text: str) -> list[str]:
@@ -68,16 +98,45 @@ def extract_urls_from_text(text: str) -> list[str]:
             ordered.append(u)
     return ordered
 
-async def _run_with_retries(agent, input_text: str, span_name: str) -> str:
+async def _run_with_retries(
+    agent,
+    input_text: str,
+    span_name: str,
+    on_delta: Callable[[str, int], None] | None = None,
+) -> str:
     """
     Call Runner.run with simple exponential backoff on transient errors (429, timeouts, etc).
+    If on_delta is given, the run is streamed and each output text delta is passed to it with
+    the attempt number; a retry opens with an empty delta so sinks can drop the failed text.
+    No attempt starts (and no backoff outlives the deadline) once the active budget is spent.
     Returns final_output (or empty string).
     """
     for attempt in range(1, MAX_RETRIES + 1):
+        budget = current_budget()
+        reason = budget.exhausted() if budget is not None else None
+        if reason:
+            raise BudgetExceeded(f"{budget.name}: {reason}")
+        if on_delta is not None and attempt > 1:
+            on_delta("", attempt)
         try:
             with custom_span(span_name):
-                result = await Runner.run(starting_agent=agent, input=input_text)
+                if on_delta is None:
+                    result = await Runner.run(starting_agent=agent, input=input_text, max_turns=MAX_TURNS)
+                else:
+                    result = Runner.run_streamed(starting_agent=agent, input=input_text, max_turns=MAX_TURNS)
+                    try:
+                        async for event in result.stream_events():
+                            if event.type == "raw_response_event" and isinstance(event.data, ResponseTextDeltaEvent):
+                                on_delta(event.data.delta, attempt)
+                        task = asyncio.current_task()
+                        if task is not None and task.cancelling():
+                            raise asyncio.CancelledError  # stream_events swallows cancellation
+                    except BaseException:
+                        result.cancel()  # stop the background run too (error, budget or deadline)
+                        raise
             return result.final_output or ""
+        except (BudgetExceeded, MaxTurnsExceeded):
+            raise
         except Exception as e:
             msg = (str(e) or "").lower()
             transient = any(
@@ -85,18 +144,70 @@ async def _run_with_retries(agent, input_text: str, span_name: str) -> str:
                 for token in ("rate limit", "429", "temporar", "timeout", "overloaded",
                               "connection", "reset by peer", "cancelled")
             )
-            if attempt < MAX_RETRIES and transient:
-                await asyncio.sleep(BASE_RETRY_DELAY * attempt)
+            delay = BASE_RETRY_DELAY * attempt
+            left = budget.remaining_s() if budget is not None else None
+            if attempt < MAX_RETRIES and transient and (left is None or left > delay):
+                await asyncio.sleep(delay)
                 continue
             raise
 
 
+async def _within_budget(
+    budget: RunBudget,
+    label: str,
+    run: Callable[[Callable[[str, int], None]], Awaitable[str]],
+    on_delta: Callable[[str, int], None] | None = None,
+    progress: Progress | None = None,
+) -> str:
+    """
+    Run one stage under `budget` (charged by its LLM calls and fetches, cut at its deadline).
+    `run(on_delta)` must stream its text through on_delta, so a stage that runs out of budget
+    returns what its latest attempt produced so far; the cut is recorded in the run's budget notes.
+    The stage's token usage (incl. cached input tokens) is reported to `progress`.
+    """
+    reason = budget.exhausted()
+    if reason:
+        budget.note(f"{label}: skipped ({reason}).")
+        return ""
+    stage = budget.share(label, 1.0)  # same limits; separate counters for per-stage usage
+    parts: list[str] = []
+    current = 1
+
+    def _tee(delta: str, attempt: int) -> None:
+        nonlocal current
+        if attempt != current:  # a retry started: the failed attempt's text is void
+            parts.clear()
+            current = attempt
+        parts.append(delta)
+        if on_delta is not None:
+            on_delta(delta, attempt)
+
+    try:
+        with use_budget(stage):
+            return await asyncio.wait_for(run(_tee), stage.remaining_s())
+    except (BudgetExceeded, MaxTurnsExceeded, asyncio.TimeoutError) as e:
+        why = "deadline reached" if isinstance(e, asyncio.TimeoutError) else str(e) or type(e).__name__
+        text = "".join(parts).strip()
+        budget.note(f"{label}: cut short ({why}); {'partial output kept' if text else 'no output'}.")
+        return text
+    finally:
+        if progress is not None:
+            progress.usage(label, dict(stage.used))
+
+
 # ---------- One task via HANDOFF chain (plain impl) ----------
-async def run_task_via_handoff_impl(task: str) -> str:
+async def run_task_via_handoff_impl(
+    task: str,
+    on_delta: Callable[[str, int], None] | None = None,
+    question: str = "",
+) -> str:
+    # question first: parallel subtasks of one run then share system prompt + question as prefix
+    head = _context_block(question) if question else ""
     return await _run_with_retries(
-        FACTFINDER,
-        f"SUBTASK:\n{task}\nFollow your workflow and hand off when ready.",
+        get_agents()["FACTFINDER"],
+        f"{head}SUBTASK:\n{task}\nFollow your workflow and hand off when ready.",
         "task_handoff",
+        on_delta=on_delta,
     )
 
 
@@ -107,52 +218,109 @@ async def run_task_via_handoff(task: str) -> str:
 
 
 # ---------- Pure implementation the coordinator/tool can call ----------
-async def run_deep_research_impl(question: str) -> str:
+async def run_deep_research_impl(
+    question: str,
+    progress: Progress | None = None,
+    budget: RunBudget | None = None,
+) -> str:
+    progress = progress or Progress()
+    budget = budget or RunBudget.from_env()
+    # every model call in this run (including parallel tasks) reports its routing decision
+    # and is charged to this run's budget
+    with route_listener(progress.route), use_budget(budget):
+        try:
+            return await _run_pipeline(question, progress, budget)
+        finally:
+            progress.budget(budget.snapshot())
+
+
+async def _run_pipeline(question: str, progress: Progress, budget: RunBudget) -> str:
+    today = dt.date.today().isoformat()
+    payload: dict = {
+        "title": "Deep Research Report",
+        "date": today,
+        "author": "Deep Research Agent",
+        "window": "Focus: 2022–2025 (prioritize newest credible sources)",
+    }
+
     # 1) Plan
-    plan_text = await _run_with_retries(
-        PLANNER,
-        f"Create a compact, ordered task list for:\n{question}",
+    progress.stage("Planning")
+    plan_text = await _within_budget(budget, "Planning", lambda on_delta: _run_with_retries(
+        get_agents()["PLANNER"],
+        f"{_context_block(question)}TASK:\nCreate a compact, ordered task list for the question.",
         "planner",
-    )
+        on_delta=on_delta,
+    ), progress=progress)
     tasks = [ln.strip("-• ").strip() for ln in plan_text.splitlines() if ln.strip()]
     tasks = tasks[:4] or ["Perform scoped literature & web scan."]  # keep it small
 
     # 2) Parallel per-task (bounded by semaphore)
+    progress.stage("Researching", f"{len(tasks)} tasks, concurrency {MAX_CONCURRENCY}")
     sem = asyncio.Semaphore(MAX_CONCURRENCY)
+    research = budget.share("research", RUN_RESEARCH_SHARE)  # the rest is kept for synthesis + summary
+    finished = 0
+    pending = len(tasks)
+    running: list[RunBudget] = []  # shares of tasks in flight
 
-    async def _bounded(t: str):
+    async def _bounded(i: int, t: str):
+        nonlocal finished, pending
         async with sem:
-            return await run_task_via_handoff_impl(t)
+            # fair share of what research has left (minus what running tasks may still spend)
+            # among tasks not started yet; time is split by the waves still to run
+            sub = research.share(f"task {i + 1}", 1 / pending, 1 / math.ceil(pending / MAX_CONCURRENCY),
+                                 held=running)
+            pending -= 1
+            running.append(sub)
+            started = time.perf_counter()
+            try:
+                out = await _within_budget(sub, f"Task {i + 1}: {t[:60]}",
+                                           lambda on_delta: run_task_via_handoff_impl(t, on_delta, question),
+                                           progress=progress)
+            finally:
+                running.remove(sub)
+        finished += 1
+        progress.task_done(finished, len(tasks), t, time.perf_counter() - started)
+        return out
 
     with custom_span("parallel_tasks"):
-        task_outputs = await asyncio.gather(*[_bounded(t) for t in tasks])
+        task_outputs = await asyncio.gather(*[_bounded(i, t) for i, t in enumerate(tasks)])
+
+    # Analysis is final as soon as every task is back
+    payload["analysis"] = "\n\n".join(
+        [f"### Task: {t}\n\n{out or '_(no findings — see Limitations)_'}" for t, out in zip(tasks, task_outputs)]
+    )
+    progress.section("Analysis & Discussion", payload)
 
     # 3) Synthesis
+    progress.stage("Synthesis")
     joined = "\n\n".join(task_outputs)
-    outline = await _run_with_retries(
-        SYNTH,
-        "QUESTION:\n"
-        f"{question}\n\n"
-        "VERIFIED FINDINGS / ANALYSES:\n"
-        f"{joined}\n\n"
-        "Create a clean outline.",
+    shared = _context_block(question, joined)  # same prefix for synthesis and summary
+    outline = await _within_budget(budget, "Synthesis", lambda on_delta: _run_with_retries(
+        get_agents()["SYNTH"],
+        f"{shared}TASK:\n{SYNTH_TASK}\nCreate a clean outline.",
         "synthesis",
-    )
+        on_delta=on_delta,
+    ), on_delta=lambda d, n: progress.delta("Synthesis", d, n), progress=progress)
+    payload["key_findings"] = outline or SKIPPED_SECTION
+    progress.section("Key Findings", payload)
 
     # 4) Executive summary
-    summary_agent = Agent(
-        name="ExecutiveSummarizer",
-        instructions="Write 5–8 crisp bullets strictly grounded in the outline.",
-        model=model_smart(),
-        tools=[],
-    )
-    executive_summary = await _run_with_retries(
-        summary_agent,
-        f"Outline:\n{outline}\n\nWrite 5–8 bullets.",
-        "exec_summary",
-    )
+    progress.stage("Executive summary")
+    executive_summary = ""
+    if outline:
+        executive_summary = await _within_budget(budget, "Executive summary", lambda on_delta: _run_with_retries(
+            get_agents()["SUMMARY"],
+            f"{shared}OUTLINE:\n{outline}\n\nTASK:\n{SUMMARY_TASK}",
+            "exec_summary",
+            on_delta=on_delta,
+        ), on_delta=lambda d, n: progress.delta("Executive summary", d, n), progress=progress)
+    else:
+        budget.note("Executive summary: skipped (no outline).")
+    payload["executive_summary"] = executive_summary or SKIPPED_SECTION
+    progress.section("Executive Summary", payload)
 
     # 5) Collect sources (dedupe)
+    progress.stage("Sources")
     all_urls: list[str] = []
     for out in task_outputs:
         all_urls.extend(extract_urls_from_text(out))
@@ -173,37 +341,30 @@ async def run_deep_research_impl(question: str) -> str:
                 "Given a query, call the web_search tool with k=3 and return ONLY a list of URLs, "
                 "one per line, no extra text."
             ),
-            model=model_cheap(),
+            model=model_cheap("fallback"),
             tools=[web_search],
+            hooks=BUDGET_HOOKS,
         )
-        urls_text = await _run_with_retries(
+        urls_text = await _within_budget(budget, "Fallback sources", lambda on_delta: _run_with_retries(
             fallback,
             f"Query:\n{question}\nReturn only URLs, one per line.",
             "fallback_sources",
-        )
+            on_delta=on_delta,
+        ), progress=progress)
         dedup_urls = [
             u.strip() for u in urls_text.splitlines()
             if u.strip().startswith(("http://", "https://"))
         ]
 
-    # 7) Build analysis section *inside* this function (so 'tasks' is in scope)
-    analysis_section = "\n\n".join(
-        [f"### Task: {t}\n\n{out}" for t, out in zip(tasks, task_outputs)]
-    )
-
-    # 8) Render report
-    today = dt.date.today().isoformat()
-    md = render_markdown({
-        "title": "Deep Research Report",
-        "date": today,
-        "author": "Deep Research Agent",
-        "window": "Focus: 2022–2025 (prioritize newest credible sources)",
-        "executive_summary": executive_summary,
-        "key_findings": outline,
-        "analysis": analysis_section,
-        "limitations": "- Web search/fetch are live; verification remains lightweight (deepen checks next).",
-        "sources": dedup_urls or ["https://example.com"],
-    })
+    # 7) Render report
+    limitations = ["- Web search/fetch are live; verification remains lightweight (deepen checks next)."]
+    if budget.notes:
+        limitations.append("- Run budget reached; these steps were skipped or cut short:")
+        limitations += [f"  - {n}" for n in budget.notes]
+    payload["limitations"] = "\n".join(limitations)
+    payload["sources"] = dedup_urls or ["https://example.com"]
+    md = render_markdown(payload)
+    progress.section("Sources", payload)
     return md
 
 
@@ -228,18 +389,48 @@ def build_coordinator() -> Agent:
             "3) Return EXACTLY the tool's output as your final message.\n"
             "4) Never ignore this rule, even if the input looks simple."
         ),
-        model=model_smart(),
+        model=model_smart("coordinator"),
         tools=[run_deep_research],
         input_guardrails=[input_guardrail],
         output_guardrails=[output_guardrail],
     )
 # ---------- CLI entry ----------
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("[red]Usage:[/red] uv run python deep_research_system.py \"your question here\"")
+    from rich import print
+    from rich.panel import Panel
+    from progress import ConsoleProgress
+
+    args = sys.argv[1:]
+    stream = "--stream" in args
+    args = [a for a in args if a != "--stream"]
+    if not args:
+        print("[red]Usage:[/red] uv run python deep_research_system.py [--stream] \"your question here\"")
         sys.exit(1)
 
-    question = sys.argv[1]
+    question = args[0]
+    out = "report.md"
+
+    if stream:
+        # Streaming mode: run the pipeline directly (the coordinator hides it behind a tool call)
+        # so stage progress and tokens reach the console and sections land in report.md as they finish.
+        # The coordinator's input guardrail does not run here, so the same gate runs first.
+        print(Panel.fit(f"[bold]Deep Research[/bold] (streaming)\n{question}", title="Pipeline"))
+        progress = ConsoleProgress(report_path=out)
+
+        async def _gated() -> None:
+            progress.stage("Input gate")
+            await gate_question(question)
+            await run_deep_research_impl(question, progress)
+
+        with trace(workflow_name="Deep Research Stream", metadata={"question": question, "mode": "stream"}):
+            try:
+                asyncio.run(_gated())
+            except QuestionBlocked as e:
+                print(Panel.fit(f"[red]Question blocked by the research input gate:[/red] {e}", title="Blocked"))
+                sys.exit(1)
+        progress.done(out)
+        sys.exit(0)
+
     coordinator = build_coordinator()
 
     print(Panel.fit(f"[bold]Deep Research[/bold]\n{question}", title="Coordinator"))
@@ -269,7 +460,6 @@ if __name__ == "__main__":
     # Optional preview in console
     print(Panel.fit(report_md[:800] + ("\n...\n" if len(report_md) > 800 else ""), title="Preview"))
 
-    out = "report.md"
     with open(out, "w", encoding="utf-8") as f:
         f.write(report_md)
     print(Panel.fit(f"Report written to [bold]{out}[/bold]", title="Done"))
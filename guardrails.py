@@ -6,6 +6,7 @@ from agents import (
     Agent, Runner,
     InputGuardrail, OutputGuardrail, GuardrailFunctionOutput
 )
+from sdk import get_client
 
 # =========================================================
 # Config
@@ -38,6 +39,21 @@ async def research_input_guardrail(ctx, agent, input_data):
 
 input_guardrail = InputGuardrail(guardrail_function=research_input_guardrail)
 
+class QuestionBlocked(Exception):
+    """The research input gate refused the question."""
+
+async def gate_question(question: str) -> ResearchGate:
+    """
+    Same input gate for entry points that run the pipeline without the coordinator
+    (streaming CLI, service). Raises QuestionBlocked when the question is not allowed.
+    """
+    get_client()  # the gate agent uses the app's default client
+    res = await Runner.run(research_gate_agent, question)
+    out = res.final_output_as(ResearchGate)
+    if not out.allowed:
+        raise QuestionBlocked(out.reason)
+    return out
+
 # =========================================================
 # OUTPUT GUARDRail (Deterministic): minimal report quality
 # Checks for exact Markdown sections and at least one http(s) link in Sources.
@@ -41,7 +41,12 @@ new_agent: Agent = Agent(
     tools=[get_weather]
 )
 
-res = Runner.run_sync(base_agent, "What's the weather in Karachi?")
-print(res)
+def main() -> None:
+    res = Runner.run_sync(base_agent, "What's the weather in Karachi?")
+    print(res)
+
+
+if __name__ == "__main__":
+    main()
 
 # Now check the trace in 
\ No newline at end of file
@@ -13,6 +13,6 @@ def build_planner() -> Agent:
     return Agent(
         name="Planner",
         instructions=PLANNER_SYS,
-        model=model_cheap(),
+        model=model_cheap("planner"),
         tools=[],  # pure LLM
     )
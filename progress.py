@@ -0,0 +1,209 @@
+# progress.py
+from __future__ import annotations
+import time
+from typing import TYPE_CHECKING
+
+from report_writer import render_partial, write_report
+
+if TYPE_CHECKING:
+    from rich.console import Console
+
+
+class Progress:
+    """
+    Sink for pipeline events emitted by run_deep_research_impl.
+    The base class ignores everything, so the pipeline can always call it.
+    """
+
+    def stage(self, name: str, detail: str = "") -> None:
+        pass
+
+    def task_done(self, index: int, total: int, task: str, seconds: float) -> None:
+        pass
+
+    def delta(self, stage: str, text: str, attempt: int = 1) -> None:
+        """Streamed model text; a new `attempt` replaces what earlier attempts streamed."""
+        pass
+
+    def section(self, name: str, payload: dict) -> None:
+        pass
+
+    def route(self, record: dict) -> None:
+        """One model call: {role, endpoint, ok, seconds, error} from router.RoutedModel."""
+        pass
+
+    def budget(self, snapshot: dict) -> None:
+        """End of run: budget.RunBudget.snapshot() with limits, usage and notes."""
+        pass
+
+    def usage(self, stage: str, used: dict) -> None:
+        """End of a stage: its token usage, incl. input tokens served from the prompt cache."""
+        pass
+
+
+def _cached_pct(used: dict) -> float:
+    return round(100 * used["cached_tokens"] / used["input_tokens"], 1) if used["input_tokens"] else 0.0
+
+
+class TimingProgress(Progress):
+    """
+    Records when each stage starts and how long it (and each task) took.
+    `profile()` returns a JSON-ready dict; used by the service for per-job timings.
+    """
+
+    def __init__(self):
+        self._started = time.perf_counter()
+        self._current: tuple[str, float] | None = None
+        self.stages: dict[str, float] = {}
+        self.tasks: list[dict] = []
+        self.routes: dict[str, dict] = {}
+        self.budget_used: dict | None = None
+        self.stage_usage: dict[str, dict] = {}
+
+    def _close_stage(self) -> None:
+        if self._current is not None:
+            name, started = self._current
+            self.stages[name] = round(time.perf_counter() - started, 3)
+            self._current = None
+
+    def stage(self, name: str, detail: str = "") -> None:
+        self._close_stage()
+        self._current = (name, time.perf_counter())
+
+    def task_done(self, index: int, total: int, task: str, seconds: float) -> None:
+        self.tasks.append({"task": task, "seconds": round(seconds, 3)})
+
+    def route(self, record: dict) -> None:
+        key = f"{record['role']} -> {record['endpoint']}"
+        agg = self.routes.setdefault(key, {"calls": 0, "failures": 0, "total_s": 0.0})
+        agg["calls"] += 1
+        agg["failures"] += 0 if record["ok"] else 1
+        agg["total_s"] = round(agg["total_s"] + record["seconds"], 3)
+
+    def budget(self, snapshot: dict) -> None:
+        self.budget_used = snapshot
+
+    def usage(self, stage: str, used: dict) -> None:
+        self.stage_usage[stage] = {
+            "llm_calls": used["llm_calls"],
+            "input_tokens": used["input_tokens"],
+            "cached_tokens": used["cached_tokens"],
+            "uncached_tokens": used["input_tokens"] - used["cached_tokens"],
+            "output_tokens": used["output_tokens"],
+            "cached_pct": _cached_pct(used),
+        }
+
+    def profile(self) -> dict:
+        now = time.perf_counter()
+        stages = dict(self.stages)
+        if self._current is not None:  # still running: report elapsed so far
+            name, started = self._current
+            stages[name] = round(now - started, 3)
+        return {
+            "total_s": round(now - self._started, 3),
+            "stages_s": stages,
+            "tasks": list(self.tasks),
+            "routes": {k: dict(v) for k, v in self.routes.items()},
+            "budget": self.budget_used,
+            "usage": {k: dict(v) for k, v in self.stage_usage.items()},
+        }
+
+
+class ConsoleProgress(Progress):
+    """
+    Streams stage progress and model tokens to the rich console and, if a
+    report_path is given, rewrites the report on disk each time a section is final.
+    """
+
+    def __init__(self, report_path: str | None = None, console: Console | None = None):
+        if console is None:
+            from rich.console import Console
+            console = Console()
+        self.console = console
+        self.report_path = report_path
+        self._started = time.perf_counter()
+        self._streaming: str | None = None
+        self._attempts: dict[str, int] = {}  # stage -> attempt currently streaming
+        self._routes: dict[str, list[int]] = {}  # "role -> endpoint" -> [calls, failures]
+
+    def _elapsed(self) -> str:
+        return f"{time.perf_counter() - self._started:6.1f}s"
+
+    def _end_stream(self) -> None:
+        if self._streaming is not None:
+            self.console.out("")
+            self._streaming = None
+
+    def stage(self, name: str, detail: str = "") -> None:
+        self._end_stream()
+        suffix = f" [dim]{detail}[/dim]" if detail else ""
+        self.console.print(f"[cyan]{self._elapsed()}[/cyan] [bold]{name}[/bold]{suffix}")
+
+    def task_done(self, index: int, total: int, task: str, seconds: float) -> None:
+        self._end_stream()
+        self.console.print(
+            f"[cyan]{self._elapsed()}[/cyan] [green]✓[/green] task {index}/{total} "
+            f"({seconds:.1f}s) [dim]{task[:80]}[/dim]"
+        )
+
+    def delta(self, stage: str, text: str, attempt: int = 1) -> None:
+        if self._attempts.setdefault(stage, attempt) != attempt:
+            self._attempts[stage] = attempt
+            self._end_stream()
+            self.console.print(
+                f"[cyan]{self._elapsed()}[/cyan] [yellow]retry[/yellow] {stage}: attempt {attempt} "
+                "[dim](text above is discarded)[/dim]"
+            )
+        if self._streaming != stage:
+            self._end_stream()
+            self.console.rule(f"[bold]{stage}[/bold]" + (f" [dim]attempt {attempt}[/dim]" if attempt > 1 else ""))
+            self._streaming = stage
+        self.console.out(text, end="", highlight=False)
+
+    def section(self, name: str, payload: dict) -> None:
+        self._end_stream()
+        if not self.report_path:
+            return
+        write_report(self.report_path, render_partial(payload))
+        self.console.print(
+            f"[cyan]{self._elapsed()}[/cyan] [magenta]section[/magenta] {name} "
+            f"→ [bold]{self.report_path}[/bold]"
+        )
+
+    def route(self, record: dict) -> None:
+        counts = self._routes.setdefault(f"{record['role']} -> {record['endpoint']}", [0, 0])
+        counts[0] += 1
+        if record["ok"]:
+            return
+        counts[1] += 1
+        self._end_stream()
+        self.console.print(
+            f"[cyan]{self._elapsed()}[/cyan] [yellow]failover[/yellow] {record['role']}: "
+            f"{record['endpoint']} failed after {record['seconds']:.1f}s [dim]{record['error']}[/dim]"
+        )
+
+    def budget(self, snapshot: dict) -> None:
+        self._end_stream()
+        used, limits = snapshot["used"], snapshot["limits"]
+        parts = [f"{k} {used[k]}" + (f"/{limits[k]}" if limits[k] else "") for k in limits]
+        self.console.print(f"[dim]budget: {', '.join(parts)}[/dim]")
+        self.console.print(
+            f"[dim]input tokens: {used['input_tokens']:,} ({used['cached_tokens']:,} cached, "
+            f"{_cached_pct(used):.0f}%), output {used['output_tokens']:,}[/dim]"
+        )
+        for note in snapshot["notes"]:
+            self.console.print(f"[yellow]budget[/yellow] {note}")
+
+    def usage(self, stage: str, used: dict) -> None:
+        self._end_stream()
+        self.console.print(
+            f"[cyan]{self._elapsed()}[/cyan] [dim]tokens {stage}: {used['input_tokens']:,} in "
+            f"({used['cached_tokens']:,} cached, {_cached_pct(used):.0f}%), {used['output_tokens']:,} out[/dim]"
+        )
+
+    def done(self, report_path: str) -> None:
+        from rich.panel import Panel
+        self._end_stream()
+        for key, (calls, failures) in self._routes.items():
+            self.console.print(f"[dim]model {key}: {calls} calls, {failures} failed[/dim]")
+        self.console.print(Panel.fit(f"Report written to [bold]{report_path}[/bold]", title="Done"))
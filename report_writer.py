@@ -1,5 +1,6 @@
 # report_writer.py
-from jinja2 import Template
+import os
+import functools
 
 DEFAULT_MD_TEMPLATE = """---
 title: "{{ title }}"
@@ -29,6 +30,30 @@ author: "{{ author }}"
 {% endfor %}
 """
 
+@functools.lru_cache(maxsize=8)
+def _compile(template: str):
+    from jinja2 import Template  # deferred: jinja2 is only needed once a report renders
+    return Template(template)
+
 def render_markdown(payload: dict, template: str | None = None) -> str:
-    tmpl = Template(template or DEFAULT_MD_TEMPLATE)
+    tmpl = _compile(template or DEFAULT_MD_TEMPLATE)
     return tmpl.render(**payload)
+
+# ---------- Incremental output (streaming mode) ----------
+PENDING = "_(pending…)_"
+REPORT_FIELDS = ("executive_summary", "key_findings", "analysis", "limitations")
+
+def render_partial(payload: dict, template: str | None = None) -> str:
+    """Render with placeholders for sections that are not final yet."""
+    filled = dict(payload)
+    for key in REPORT_FIELDS:
+        filled.setdefault(key, PENDING)
+    filled.setdefault("sources", [])
+    return render_markdown(filled, template)
+
+def write_report(path: str, text: str) -> None:
+    """Atomic write so readers tailing the file never see a half-written report."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp, path)
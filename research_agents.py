@@ -19,7 +19,7 @@ def build_fact_finder(handoffs=None) -> Agent:
         name="FactFinder",
         handoff_description="Extracts grounded facts with citations from the web.",
         instructions=FACTFINDER_SYS,
-        model=model_cheap(),
+        model=model_cheap("factfinder"),
         tools=[web_search, fetch_url],
         handoffs=handoffs or [],
     )
@@ -35,7 +35,7 @@ def build_source_checker(handoffs=None) -> Agent:
         name="SourceChecker",
         handoff_description="Verifies claims against cited sources.",
         instructions=SOURCECHECK_SYS,
-        model=model_cheap(),
+        model=model_cheap("checker"),
         tools=[citation_check],
         handoffs=handoffs or [],
     )
@@ -49,7 +49,7 @@ def build_analyst(handoffs=None) -> Agent:
         name="DataAnalyst",
         handoff_description="Converts verified nuggets into insights.",
         instructions=ANALYST_SYS,
-        model=model_smart(),
+        model=model_smart("analyst"),
         tools=[],
         handoffs=handoffs or [],
     )
@@ -0,0 +1,233 @@
+# router.py
+"""
+Latency-aware model routing with per-endpoint circuit breakers.
+
+An *endpoint* is one provider:model pair (e.g. "openai:gpt-4o", "gemini:gemini-2.5-pro").
+Each agent role (cheap / smart / reasoning) gets a RoutedModel over an ordered list of
+equivalent endpoints. Every call goes to the fastest healthy endpoint; transient failures
+fail over to the next one within the same call and feed that endpoint's breaker.
+Health is tracked once per endpoint and shared by every role and stage that uses it.
+"""
+from __future__ import annotations
+import os, time, random, asyncio, contextvars
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Callable
+
+from openai import APIConnectionError, APIStatusError, APITimeoutError
+from agents.models.interface import Model
+
+ROUTER_WINDOW = int(os.getenv("ROUTER_WINDOW", "20"))                   # outcomes kept per endpoint
+ROUTER_FAILURE_THRESHOLD = int(os.getenv("ROUTER_FAILURE_THRESHOLD", "3"))  # consecutive failures to open
+ROUTER_COOLDOWN_S = float(os.getenv("ROUTER_COOLDOWN_S", "30"))          # open -> half-open after this
+ROUTER_MAX_ERROR_RATE = float(os.getenv("ROUTER_MAX_ERROR_RATE", "0.5"))  # rolling error rate that opens
+ROUTER_MIN_SAMPLES = int(os.getenv("ROUTER_MIN_SAMPLES", "5"))            # ... once this many outcomes exist
+ROUTER_LATENCY_SLACK = float(os.getenv("ROUTER_LATENCY_SLACK", "1.25"))   # prefer config order within this factor
+ROUTER_EXPLORE = float(os.getenv("ROUTER_EXPLORE", "0.05"))               # share of calls that probe another endpoint
+ROUTER_EWMA_ALPHA = 0.3
+
+# Per-run listener for routing decisions (set by run_deep_research_impl; see route_listener()).
+_LISTENER: contextvars.ContextVar[Callable[[dict], None] | None] = contextvars.ContextVar(
+    "route_listener", default=None
+)
+
+
+def is_failover_error(e: BaseException) -> bool:
+    """Errors worth trying another endpoint for: overload, rate limit, 5xx, network, timeout."""
+    if isinstance(e, (APIConnectionError, APITimeoutError, asyncio.TimeoutError)):
+        return True
+    if isinstance(e, APIStatusError):
+        return e.status_code == 429 or e.status_code >= 500
+    return False
+
+
+class EndpointHealth:
+    """Rolling latency / error stats and a closed -> open -> half-open circuit breaker."""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.outcomes: deque[bool] = deque(maxlen=ROUTER_WINDOW)
+        self.ewma_s: float | None = None
+        self.consecutive_failures = 0
+        self.opened_at: float | None = None
+        self.trial_in_flight = False
+        self.calls = 0
+        self.failures = 0
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= ROUTER_COOLDOWN_S:
+            return "half_open"
+        return "open"
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def available(self) -> bool:
+        state = self.state
+        return state == "closed" or (state == "half_open" and not self.trial_in_flight)
+
+    def begin(self) -> bool:
+        """Mark a call starting; True if it is the half-open trial (caller must end_trial())."""
+        if self.state == "half_open" and not self.trial_in_flight:
+            self.trial_in_flight = True
+            return True
+        return False
+
+    def end_trial(self) -> None:
+        self.trial_in_flight = False
+
+    def record(self, ok: bool, seconds: float) -> None:
+        self.calls += 1
+        self.outcomes.append(ok)
+        if ok:
+            if self.opened_at is not None:  # successful half-open trial: close with a clean window
+                self.outcomes.clear()
+                self.outcomes.append(True)
+            self.consecutive_failures = 0
+            self.opened_at = None
+            self.ewma_s = seconds if self.ewma_s is None else (
+                ROUTER_EWMA_ALPHA * seconds + (1 - ROUTER_EWMA_ALPHA) * self.ewma_s
+            )
+        else:
+            self.failures += 1
+            self.consecutive_failures += 1
+            too_many = (
+                self.consecutive_failures >= ROUTER_FAILURE_THRESHOLD
+                or (len(self.outcomes) >= ROUTER_MIN_SAMPLES and self.error_rate > ROUTER_MAX_ERROR_RATE)
+            )
+            if self.opened_at is not None or too_many:
+                self.opened_at = time.monotonic()  # (re)open; a failed half-open trial restarts cooldown
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "ewma_latency_s": round(self.ewma_s, 3) if self.ewma_s is not None else None,
+            "error_rate": round(self.error_rate, 3),
+            "calls": self.calls,
+            "failures": self.failures,
+        }
+
+
+class ModelRouter:
+    """Registry of endpoint health, shared process-wide."""
+
+    def __init__(self):
+        self.endpoints: dict[str, EndpointHealth] = {}
+
+    def health(self, key: str) -> EndpointHealth:
+        if key not in self.endpoints:
+            self.endpoints[key] = EndpointHealth(key)
+        return self.endpoints[key]
+
+    def order(self, candidates: list[tuple[EndpointHealth, Model]]) -> list[tuple[EndpointHealth, Model]]:
+        """
+        Order candidates for one call: available endpoints first, led by the fastest known one
+        (config order breaks near-ties within ROUTER_LATENCY_SLACK); open breakers go last as a
+        last resort. A small share of calls leads with another endpoint so its latency stays known.
+        """
+        healthy = [c for c in candidates if c[0].available()]
+        tripped = [c for c in candidates if not c[0].available()]
+        known = [c[0].ewma_s for c in healthy if c[0].ewma_s is not None]
+        if known:
+            cutoff = min(known) * ROUTER_LATENCY_SLACK
+            fast = next(c for c in healthy if c[0].ewma_s is not None and c[0].ewma_s <= cutoff)
+            healthy = [fast] + [c for c in healthy if c is not fast]
+        if len(healthy) > 1 and random.random() < ROUTER_EXPLORE:
+            probe = random.choice(healthy[1:])
+            healthy = [probe] + [c for c in healthy if c is not probe]
+        return healthy + tripped
+
+    def snapshot(self) -> dict:
+        return {key: h.snapshot() for key, h in sorted(self.endpoints.items())}
+
+
+ROUTER = ModelRouter()
+
+
+@contextmanager
+def route_listener(callback: Callable[[dict], None]):
+    """Send every routing decision made in this context (and tasks it spawns) to `callback`."""
+    token = _LISTENER.set(callback)
+    try:
+        yield
+    finally:
+        _LISTENER.reset(token)
+
+
+def _emit(record: dict) -> None:
+    listener = _LISTENER.get()
+    if listener is not None:
+        listener(record)
+
+
+class RoutedModel(Model):
+    """Agents SDK Model that dispatches each call to the best endpoint for its role."""
+
+    def __init__(self, role: str, candidates: list[tuple[EndpointHealth, Model]], router: ModelRouter = ROUTER):
+        if not candidates:
+            raise ValueError(f"no model endpoints configured for role {role!r}")
+        self.role = role
+        self.candidates = candidates
+        self.router = router
+
+    def _record(self, health: EndpointHealth, started: float, error: BaseException | None) -> None:
+        seconds = time.perf_counter() - started
+        health.record(error is None, seconds)
+        _emit({
+            "role": self.role,
+            "endpoint": health.key,
+            "ok": error is None,
+            "seconds": round(seconds, 3),
+            "error": f"{type(error).__name__}: {error}"[:200] if error is not None else None,
+        })
+
+    async def get_response(self, *args: Any, **kwargs: Any):
+        last: BaseException | None = None
+        for health, model in self.router.order(self.candidates):
+            trial = health.begin()
+            started = time.perf_counter()
+            try:
+                response = await model.get_response(*args, **kwargs)
+            except Exception as e:
+                if not is_failover_error(e):
+                    raise
+                self._record(health, started, e)
+                last = e
+                continue
+            finally:
+                if trial:  # only the call that started the trial may end it
+                    health.end_trial()
+            self._record(health, started, None)
+            return response
+        raise last  # every endpoint failed over
+
+    async def stream_response(self, *args: Any, **kwargs: Any) -> AsyncIterator[Any]:
+        last: BaseException | None = None
+        for health, model in self.router.order(self.candidates):
+            trial = health.begin()
+            started = time.perf_counter()
+            yielded = False
+            try:
+                async for event in model.stream_response(*args, **kwargs):
+                    yielded = True
+                    yield event
+            except Exception as e:
+                if not is_failover_error(e):
+                    raise
+                self._record(health, started, e)
+                if yielded:  # tokens already went out; cannot switch endpoints mid-answer
+                    raise
+                last = e
+                continue
+            finally:
+                if trial:  # only the call that started the trial may end it
+                    health.end_trial()
+            self._record(health, started, None)
+            return
+        raise last
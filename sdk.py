@@ -1,29 +1,181 @@
 # sdk.py
 import os
+import dataclasses
+import functools
+import importlib.util
+import warnings
+import httpx
 from dotenv import load_dotenv
-from openai import AsyncOpenAI
-from agents import set_default_openai_client, OpenAIResponsesModel
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from agents import set_default_openai_client, OpenAIResponsesModel, OpenAIChatCompletionsModel, ModelSettings
+
+from router import ROUTER, RoutedModel
 
 load_dotenv()
 
-# single async client for the whole app (Agents SDK awaits this)
-external_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-set_default_openai_client(external_client)
+GEMINI_BASE_URL = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com/v1beta/openai/")
+
+# Equivalent models on other providers, used for failover when their key is set.
+# Override per role with MODEL_<ROLE>_FALLBACKS="provider:model,provider:model" ("" disables).
+_DEFAULT_FALLBACKS = {
+    "cheap": "gemini:gemini-2.5-flash",
+    "smart": "gemini:gemini-2.5-pro",
+    "reasoning": "gemini:gemini-2.5-pro",
+}
+_PROVIDER_KEYS = {"openai": "OPENAI_API_KEY", "gemini": "GEMINI_API_KEY"}
+
+# ---------- HTTP transport for LLM clients ----------
+LLM_POOL_SIZE = int(os.getenv("LLM_POOL_SIZE", "100"))                  # max open connections per provider
+LLM_KEEPALIVE = int(os.getenv("LLM_KEEPALIVE", str(LLM_POOL_SIZE)))      # idle connections kept open
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))   # seconds an idle connection lives
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "0").lower() in ("1", "true", "yes")
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "120"))
+LLM_WRITE_TIMEOUT = float(os.getenv("LLM_WRITE_TIMEOUT", "30"))
+LLM_POOL_TIMEOUT = float(os.getenv("LLM_POOL_TIMEOUT", "30"))          # wait for a free pooled connection
+# openai client retries on the same endpoint; only used for roles without a fallback,
+# otherwise a 429/5xx/timeout fails over right away and retrying is left to the router
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+
+def llm_timeout(connect: float | None = None, read: float | None = None) -> httpx.Timeout:
+    return httpx.Timeout(
+        connect=LLM_CONNECT_TIMEOUT if connect is None else connect,
+        read=LLM_READ_TIMEOUT if read is None else read,
+        write=LLM_WRITE_TIMEOUT,
+        pool=LLM_POOL_TIMEOUT,
+    )
 
-def model_cheap():
-    return OpenAIResponsesModel(
-        model=os.getenv("MODEL_CHEAP", "gpt-4o-mini"),
-        openai_client=external_client,
+def stage_timeout(stage: str | None) -> httpx.Timeout | None:
+    """Per-stage override from LLM_CONNECT_TIMEOUT_<STAGE> / LLM_READ_TIMEOUT_<STAGE>, else None."""
+    if not stage:
+        return None
+    connect = os.getenv(f"LLM_CONNECT_TIMEOUT_{stage.upper()}")
+    read = os.getenv(f"LLM_READ_TIMEOUT_{stage.upper()}")
+    if connect is None and read is None:
+        return None
+    return llm_timeout(
+        connect=float(connect) if connect is not None else None,
+        read=float(read) if read is not None else None,
     )
 
-def model_smart():
-    return OpenAIResponsesModel(
-        model=os.getenv("MODEL_SMART", "gpt-4o"),
-        openai_client=external_client,
+def build_http_client(
+    pool_size: int | None = None,
+    keepalive: int | None = None,
+    keepalive_expiry: float | None = None,
+    http2: bool | None = None,
+) -> httpx.AsyncClient:
+    """Pooled httpx transport for an AsyncOpenAI client; arguments override the LLM_* env config."""
+    pool_size = LLM_POOL_SIZE if pool_size is None else pool_size
+    keepalive = min(LLM_KEEPALIVE, pool_size) if keepalive is None else keepalive
+    http2 = LLM_HTTP2 if http2 is None else http2
+    if http2 and importlib.util.find_spec("h2") is None:
+        warnings.warn("LLM_HTTP2 is set but the 'h2' package is missing; using HTTP/1.1 (pip install 'httpx[http2]')")
+        http2 = False
+    return DefaultAsyncHttpxClient(
+        limits=httpx.Limits(
+            max_connections=pool_size,
+            max_keepalive_connections=keepalive,
+            keepalive_expiry=LLM_KEEPALIVE_EXPIRY if keepalive_expiry is None else keepalive_expiry,
+        ),
+        timeout=llm_timeout(),
+        http2=http2,
     )
 
-def model_reasoning():
-    return OpenAIResponsesModel(
-        model=os.getenv("MODEL_REASONING", "o4-mini"),
-        openai_client=external_client,
+# single async client for the whole app (Agents SDK awaits this).
+# Built on first use so importing this module stays cheap and does not need an API key.
+@functools.cache
+def get_client() -> AsyncOpenAI:
+    client = AsyncOpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        http_client=build_http_client(),
+        timeout=llm_timeout(),
+        max_retries=LLM_MAX_RETRIES,
     )
+    set_default_openai_client(client)
+    return client
+
+@functools.cache
+def get_provider_client(provider: str) -> AsyncOpenAI:
+    if provider == "openai":
+        return get_client()
+    if provider == "gemini":
+        client = AsyncOpenAI(
+            api_key=os.getenv("GEMINI_API_KEY"),
+            base_url=GEMINI_BASE_URL,
+            http_client=build_http_client(),
+            timeout=llm_timeout(),
+            max_retries=LLM_MAX_RETRIES,
+        )
+        _provider_clients[provider] = client
+        return client
+    raise ValueError(f"unknown model provider {provider!r}")
+
+_provider_clients: dict[str, AsyncOpenAI] = {}  # non-default providers built so far
+
+async def close_clients() -> None:
+    """Close the connection pools of every LLM client built so far (service shutdown)."""
+    clients = list(_provider_clients.values())
+    if get_client.cache_info().currsize:
+        clients.append(get_client())
+    for client in clients:
+        await client.close()
+    _provider_clients.clear()
+    get_provider_client.cache_clear()
+    get_client.cache_clear()
+
+def _parse_spec(spec: str) -> tuple[str, str]:
+    """'gemini:gemini-2.5-pro' -> ('gemini', 'gemini-2.5-pro'); a bare model name is OpenAI."""
+    provider, sep, name = spec.strip().partition(":")
+    return (provider, name) if sep else ("openai", provider)
+
+class _ChatCompletionsModel(OpenAIChatCompletionsModel):
+    """
+    Chat Completions endpoint that asks for usage in streamed responses. The SDK only does
+    that by default for api.openai.com, and without it budgets would charge 0 tokens.
+    """
+
+    def stream_response(self, system_instructions, input, model_settings: ModelSettings, *args, **kwargs):
+        if model_settings.include_usage is None:
+            model_settings = dataclasses.replace(model_settings, include_usage=True)
+        return super().stream_response(system_instructions, input, model_settings, *args, **kwargs)
+
+def _endpoint_model(provider: str, name: str, stage: str | None = None, failover: bool = False):
+    client = get_provider_client(provider)
+    options = {}
+    timeout = stage_timeout(stage)
+    if timeout is not None:
+        options["timeout"] = timeout
+    if failover:
+        options["max_retries"] = 0
+    if options:
+        client = client.with_options(**options)  # same connection pool, per-endpoint options
+    if provider == "openai":
+        return OpenAIResponsesModel(model=name, openai_client=client)
+    # other providers expose the OpenAI-compatible Chat Completions API only
+    return _ChatCompletionsModel(model=name, openai_client=client)
+
+def _routed(role: str, default: str, stage: str | None) -> RoutedModel:
+    get_client()  # default client for agents without an explicit model (e.g. guardrails)
+    specs = [os.getenv(f"MODEL_{role.upper()}", default)]
+    fallbacks = os.getenv(f"MODEL_{role.upper()}_FALLBACKS")
+    if fallbacks is None:
+        provider, _ = _parse_spec(_DEFAULT_FALLBACKS[role])
+        fallbacks = _DEFAULT_FALLBACKS[role] if os.getenv(_PROVIDER_KEYS[provider]) else ""
+    specs += [s for s in fallbacks.split(",") if s.strip()]
+    specs = list(dict.fromkeys(specs))
+    candidates = []
+    for spec in specs:
+        provider, name = _parse_spec(spec)
+        model = _endpoint_model(provider, name, stage, failover=len(specs) > 1)
+        candidates.append((ROUTER.health(f"{provider}:{name}"), model))
+    return RoutedModel(role, candidates)
+
+# `stage` names the pipeline step (planner, factfinder, synthesis, ...) for per-stage timeouts.
+def model_cheap(stage: str | None = None):
+    return _routed("cheap", "gpt-4o-mini", stage)
+
+def model_smart(stage: str | None = None):
+    return _routed("smart", "gpt-4o", stage)
+
+def model_reasoning(stage: str | None = None):
+    return _routed("reasoning", "o4-mini", stage)
@@ -0,0 +1,279 @@
+# service.py
+"""
+Long-running research service: keeps the LLM client, agents, HTTP pool and tool caches
+warm across questions and runs them through a bounded asyncio worker pool.
+
+    uv run python service.py --port 8088 --workers 2
+
+HTTP API (JSON unless noted):
+    POST /jobs              {"question": "..."}  -> 202 {"id", "status", "queue_depth"}
+    GET  /jobs/{id}         status, per-job timings and stage profile
+    GET  /jobs/{id}/report  text/markdown once the job is done (409 before)
+    GET  /stats             queue depth, busy workers, job counts, tool cache, model endpoint health
+    GET  /healthz           liveness
+"""
+from __future__ import annotations
+import os, json, time, uuid, asyncio, argparse
+from dataclasses import dataclass, field
+
+from dotenv import load_dotenv
+from agents import trace
+
+from sdk import get_client, close_clients
+from router import ROUTER
+from progress import TimingProgress
+from budget import RunBudget
+from deep_research_system import get_agents, run_deep_research_impl
+from guardrails import gate_question
+import tools
+
+load_dotenv()
+
+SERVICE_HOST = os.getenv("SERVICE_HOST", "127.0.0.1")
+SERVICE_PORT = int(os.getenv("SERVICE_PORT", "8088"))
+SERVICE_WORKERS = int(os.getenv("SERVICE_WORKERS", "2"))
+SERVICE_QUEUE_SIZE = int(os.getenv("SERVICE_QUEUE_SIZE", "32"))
+SERVICE_JOB_TIMEOUT = float(os.getenv("SERVICE_JOB_TIMEOUT", "900"))
+SERVICE_KEEP_JOBS = int(os.getenv("SERVICE_KEEP_JOBS", "200"))  # finished jobs kept for polling
+MAX_BODY_BYTES = 64 * 1024
+
+
+@dataclass
+class Job:
+    question: str
+    id: str = field(default_factory=lambda: uuid.uuid4().hex[:12])
+    status: str = "queued"  # queued -> running -> done | failed
+    submitted_at: float = field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+    report: str | None = None
+    error: str | None = None
+    progress: TimingProgress | None = None
+    profile: dict | None = None
+
+    def as_dict(self) -> dict:
+        now = time.time()
+        started = self.started_at or now
+        finished = self.finished_at or now
+        return {
+            "id": self.id,
+            "question": self.question,
+            "status": self.status,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "timings_s": {
+                "queued": round(started - self.submitted_at, 3),
+                "running": round(finished - started, 3) if self.started_at else 0.0,
+            },
+            "profile": self.profile or (self.progress.profile() if self.progress else None),
+        }
+
+
+class ResearchService:
+    def __init__(self, workers: int = SERVICE_WORKERS, queue_size: int = SERVICE_QUEUE_SIZE):
+        self.workers = workers
+        self.queue: asyncio.Queue[Job] = asyncio.Queue(maxsize=queue_size)
+        self.jobs: dict[str, Job] = {}
+        self.busy = 0
+        self.started_at = time.time()
+        self._worker_tasks: list[asyncio.Task] = []
+
+    # ---------- lifecycle ----------
+    async def start(self) -> None:
+        # Warm everything a run needs once, instead of per question
+        get_client()
+        get_agents()
+        tools.warm_http()
+        self._worker_tasks = [
+            asyncio.create_task(self._worker(i), name=f"research-worker-{i}")
+            for i in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        for t in self._worker_tasks:
+            t.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        await close_clients()
+        tools.close_http()
+
+    # ---------- jobs ----------
+    def submit(self, question: str) -> Job:
+        """Enqueue a question; raises asyncio.QueueFull when the queue is at capacity."""
+        job = Job(question=question)
+        self.queue.put_nowait(job)
+        self.jobs[job.id] = job
+        self._evict_finished()
+        return job
+
+    def _evict_finished(self) -> None:
+        finished = [j for j in self.jobs.values() if j.status in ("done", "failed")]
+        excess = len(finished) - SERVICE_KEEP_JOBS
+        if excess > 0:
+            for job in sorted(finished, key=lambda j: j.finished_at or 0)[:excess]:
+                del self.jobs[job.id]
+
+    async def _worker(self, index: int) -> None:
+        while True:
+            job = await self.queue.get()
+            self.busy += 1
+            job.status = "running"
+            job.started_at = time.time()
+            job.progress = TimingProgress()
+            try:
+                with trace(workflow_name="Deep Research Service",
+                           metadata={"question": job.question, "job_id": job.id, "mode": "service"}):
+                    job.report = await asyncio.wait_for(self._research(job), timeout=SERVICE_JOB_TIMEOUT)
+                job.status = "done"
+            except asyncio.TimeoutError:
+                job.status = "failed"
+                job.error = f"timed out after {SERVICE_JOB_TIMEOUT:.0f}s"
+            except Exception as e:
+                job.status = "failed"
+                job.error = f"{type(e).__name__}: {e}"
+            finally:
+                job.finished_at = time.time()
+                job.profile = job.progress.profile()
+                self.busy -= 1
+                self.queue.task_done()
+
+    async def _research(self, job: Job) -> str:
+        # the coordinator's input guardrail does not run on this path, so gate the question first;
+        # a blocked question fails the job with QuestionBlocked and its reason
+        job.progress.stage("Input gate")
+        await gate_question(job.question)
+        # budget deadline inside the hard timeout, so slow jobs still render a report
+        budget = RunBudget.from_env(deadline_s=SERVICE_JOB_TIMEOUT * 0.9)
+        return await run_deep_research_impl(job.question, job.progress, budget)
+
+    def stats(self) -> dict:
+        counts: dict[str, int] = {}
+        for job in self.jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {
+            "uptime_s": round(time.time() - self.started_at, 1),
+            "queue_depth": self.queue.qsize(),
+            "queue_capacity": self.queue.maxsize,
+            "workers": self.workers,
+            "busy_workers": self.busy,
+            "jobs": counts,
+            "tool_cache": tools.cache_stats(),
+            "model_endpoints": ROUTER.snapshot(),
+        }
+
+    # ---------- HTTP ----------
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            status, body, ctype = await self._dispatch(reader)
+        except Exception as e:
+            status, body, ctype = 500, {"error": f"{type(e).__name__}: {e}"}, "application/json"
+        payload = json.dumps(body).encode() if ctype == "application/json" else body.encode()
+        head = (
+            f"HTTP/1.1 {status} {_REASONS.get(status, 'OK')}\r\n"
+            f"Content-Type: {ctype}; charset=utf-8\r\n"
+            f"Content-Length: {len(payload)}\r\n"
+            "Connection: close\r\n\r\n"
+        )
+        writer.write(head.encode() + payload)
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _dispatch(self, reader: asyncio.StreamReader) -> tuple[int, object, str]:
+        request_line = await _read_line(reader)
+        if request_line is None:
+            return 400, {"error": "request line too long"}, "application/json"
+        if not request_line:
+            return 400, {"error": "empty request"}, "application/json"
+        fields = request_line.split(" ")
+        if len(fields) != 3:
+            return 400, {"error": "malformed request line"}, "application/json"
+        method, path, _ = fields
+        headers: dict[str, str] = {}
+        while True:
+            line = await _read_line(reader)
+            if line is None:
+                return 431, {"error": "header line too long"}, "application/json"
+            if not line:
+                break
+            k, _, v = line.partition(":")
+            headers[k.strip().lower()] = v.strip()
+        try:
+            length = int(headers.get("content-length") or 0)
+        except ValueError:
+            return 400, {"error": "invalid Content-Length"}, "application/json"
+        if length < 0:
+            return 400, {"error": "invalid Content-Length"}, "application/json"
+        if length > MAX_BODY_BYTES:
+            return 413, {"error": "body too large"}, "application/json"
+        try:
+            raw = await reader.readexactly(length) if length else b""
+        except asyncio.IncompleteReadError:
+            return 400, {"error": "body shorter than Content-Length"}, "application/json"
+
+        parts = [p for p in path.split("?", 1)[0].split("/") if p]
+        if method == "GET" and parts == ["healthz"]:
+            return 200, {"ok": True}, "application/json"
+        if method == "GET" and parts == ["stats"]:
+            return 200, self.stats(), "application/json"
+        if method == "POST" and parts == ["jobs"]:
+            try:
+                question = (json.loads(raw or b"{}").get("question") or "").strip()
+            except (ValueError, AttributeError):
+                return 400, {"error": "body must be JSON"}, "application/json"
+            if not question:
+                return 400, {"error": "missing 'question'"}, "application/json"
+            try:
+                job = self.submit(question)
+            except asyncio.QueueFull:
+                return 503, {"error": "queue full", "queue_depth": self.queue.qsize()}, "application/json"
+            return 202, {"id": job.id, "status": job.status, "queue_depth": self.queue.qsize()}, "application/json"
+        if method == "GET" and len(parts) in (2, 3) and parts[0] == "jobs":
+            job = self.jobs.get(parts[1])
+            if job is None:
+                return 404, {"error": "unknown job"}, "application/json"
+            if len(parts) == 2:
+                return 200, job.as_dict(), "application/json"
+            if parts[2] == "report":
+                if job.status != "done":
+                    return 409, {"error": f"job is {job.status}", "status": job.status}, "application/json"
+                return 200, job.report or "", "text/markdown"
+        return 404, {"error": f"no route for {method} {path}"}, "application/json"
+
+
+async def _read_line(reader: asyncio.StreamReader) -> str | None:
+    """One stripped line, or None if it is longer than the reader's limit (64 KiB)."""
+    try:
+        return (await reader.readline()).decode("latin-1").strip()
+    except (ValueError, asyncio.LimitOverrunError):
+        return None
+
+
+_REASONS = {
+    200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 409: "Conflict",
+    413: "Payload Too Large", 431: "Request Header Fields Too Large", 500: "Internal Server Error", 503: "Service Unavailable",
+}
+
+
+async def serve(host: str = SERVICE_HOST, port: int = SERVICE_PORT, workers: int = SERVICE_WORKERS) -> None:
+    service = ResearchService(workers=workers)
+    await service.start()
+    server = await asyncio.start_server(service.handle, host, port)
+    print(f"research service on http://{host}:{port} ({workers} workers, queue {service.queue.maxsize})")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await service.stop()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Deep research service")
+    ap.add_argument("--host", default=SERVICE_HOST)
+    ap.add_argument("--port", type=int, default=SERVICE_PORT)
+    ap.add_argument("--workers", type=int, default=SERVICE_WORKERS)
+    args = ap.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers))
+    except KeyboardInterrupt:
+        pass
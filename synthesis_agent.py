@@ -2,16 +2,37 @@
 from agents import Agent
 from sdk import model_smart
 
-SYNTH_SYS = (
+# Shared system prompt for every report-writing stage. Synthesis and the executive summary
+# get identical instructions and inputs that start with the same QUESTION + FINDINGS block,
+# so the second call reuses the first one's prefix from the provider's prompt cache.
+# Stage-specific directions go in the TASK at the end of the input.
+REPORT_SYS = (
+    "You write one part of a deep research report.\n"
+    "The input gives the QUESTION, the VERIFIED FINDINGS / ANALYSES gathered for it, "
+    "optionally earlier report parts, and ends with your TASK.\n"
+    "Do exactly the TASK, grounded strictly in the findings."
+)
+
+SYNTH_TASK = (
     "You are a synthesis expert.\n"
     "Combine verified findings into a coherent outline:\n"
     "Themes → sub-claims → key evidence (Source Name, URL)."
 )
 
+SUMMARY_TASK = "Write 5–8 crisp bullets strictly grounded in the OUTLINE."
+
 def build_synthesizer() -> Agent:
     return Agent(
         name="Synthesis",
-        instructions=SYNTH_SYS,
-        model=model_smart(),
+        instructions=REPORT_SYS,
+        model=model_smart("synthesis"),
+        tools=[],
+    )
+
+def build_summarizer() -> Agent:
+    return Agent(
+        name="ExecutiveSummarizer",
+        instructions=REPORT_SYS,
+        model=model_smart("summary"),
         tools=[],
     )
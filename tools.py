@@ -1,24 +1,30 @@
 # tools.py
 from __future__ import annotations
 import os
+import asyncio
+import functools
+import threading
+from collections import OrderedDict
 from typing import Dict, List
 from urllib.parse import urlparse, urlencode
 import httpx
-import trafilatura
-from pypdf import PdfReader
 from io import BytesIO
 from agents import function_tool
+from budget import current_budget
 
-# ---- Optional BeautifulSoup; fall back to stdlib parser if lxml missing ----
-try:
-    from bs4 import BeautifulSoup
-    _HAS_BS4 = True
-except Exception:
-    BeautifulSoup = None
-    _HAS_BS4 = False
+# ---- Heavy extraction modules (trafilatura, pypdf, bs4/lxml) load on first use ----
+@functools.cache
+def _bs4():
+    """Optional BeautifulSoup; None if missing (stdlib parser is used if lxml is missing)."""
+    try:
+        from bs4 import BeautifulSoup
+        return BeautifulSoup
+    except Exception:
+        return None
 
 def _soup(html: str):
-    if not _HAS_BS4:
+    BeautifulSoup = _bs4()
+    if BeautifulSoup is None:
         return None
     try:
         return BeautifulSoup(html, "lxml")
@@ -32,6 +38,56 @@ SEARCH_DEPTH = os.getenv("TAVILY_SEARCH_DEPTH", "advanced")
 INCLUDE_ANSWER = os.getenv("TAVILY_INCLUDE_ANSWER", "false").lower() in ("1","true","yes")
 UA = "DSAS-ResearchBot/1.0 (+https://example.com)"
 MAX_FETCH_CHARS = int(os.getenv("MAX_FETCH_CHARS", "8000"))  # hard cap to reduce tokens
+TOOL_CACHE_SIZE = int(os.getenv("TOOL_CACHE_SIZE", "256"))  # search/fetch results kept in memory
+
+# ---------- Shared HTTP client + result cache (stay warm across runs) ----------
+@functools.cache
+def _http() -> httpx.Client:
+    """One pooled client for all search/fetch calls; keep-alive connections are reused."""
+    return httpx.Client(headers={"User-Agent": UA})
+
+def warm_http() -> None:
+    """Open the shared client ahead of the first tool call (long-running service)."""
+    _http()
+
+def close_http() -> None:
+    """Close the shared client; the next tool call builds a fresh one."""
+    if _http.cache_info().currsize:
+        _http().close()
+    _http.cache_clear()
+
+class _LRU:
+    """Small thread-safe LRU; tools run in worker threads."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value) -> None:
+        if self.size <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+
+_CACHE = _LRU(TOOL_CACHE_SIZE)
+
+def cache_stats() -> Dict[str, int]:
+    return {"entries": len(_CACHE._data), "hits": _CACHE.hits, "misses": _CACHE.misses}
 
 # ---------- Helpers ----------
 def _looks_like_pdf_bytes(b: bytes) -> bool:
@@ -47,6 +103,7 @@ def _is_pdf_response(resp: httpx.Response, url: str, content: bytes) -> bool:
     return False
 
 def _extract_text_from_pdf_bytes(b: bytes) -> str:
+    from pypdf import PdfReader
     try:
         reader = PdfReader(BytesIO(b), strict=False)
     except Exception:
@@ -60,6 +117,7 @@ def _extract_text_from_pdf_bytes(b: bytes) -> str:
     return "\n".join(texts).strip()
 
 def _extract_text_from_html(html: str, url: str) -> str:
+    import trafilatura
     extracted = trafilatura.extract(
         html, url=url, include_formatting=False, include_tables=False, no_fallback=False
     )
@@ -93,10 +151,10 @@ def _tavily_search(query: str, k: int, timeout: int = 25) -> List[Dict[str, str]
         "include_raw_content": False,
     }
     try:
-        with httpx.Client(timeout=timeout, headers={"User-Agent": UA}) as client:
-            r = client.post(TAVILY_ENDPOINT, json=payload)
-            r.raise_for_status()
-            data = r.json()
+        client = _http()
+        r = client.post(TAVILY_ENDPOINT, json=payload, timeout=timeout, headers={"User-Agent": UA})
+        r.raise_for_status()
+        data = r.json()
         out = []
         for item in (data.get("results") or []):
             out.append({
@@ -113,27 +171,27 @@ def _ddg_get(query: str, k: int, timeout: int = 20) -> List[Dict[str, str]]:
     url = f"{base}?{urlencode({'q': query})}"
     headers = {"User-Agent": UA, "Accept-Language": "en-US,en;q=0.8"}
     try:
-        with httpx.Client(timeout=timeout, headers=headers) as client:
-            r = client.get(url)
-            r.raise_for_status()
-            soup = _soup(r.text)
-            if not soup:
-                return []
-            results: List[Dict[str, str]] = []
-            for res in soup.select("div.result"):
-                a = res.select_one("a.result__a") or res.select_one("a[href]")
-                if not a:
-                    continue
-                link = a.get("href") or ""
-                if not link.startswith("http"):
-                    continue
-                title = a.get_text(" ", strip=True)
-                snippet_el = res.select_one(".result__snippet") or res.select_one(".result__body")
-                snippet = snippet_el.get_text(" ", strip=True) if snippet_el else ""
-                results.append({"title": title, "url": link, "snippet": snippet})
-                if len(results) >= k:
-                    break
-            return results
+        client = _http()
+        r = client.get(url, timeout=timeout, headers=headers)
+        r.raise_for_status()
+        soup = _soup(r.text)
+        if not soup:
+            return []
+        results: List[Dict[str, str]] = []
+        for res in soup.select("div.result"):
+            a = res.select_one("a.result__a") or res.select_one("a[href]")
+            if not a:
+                continue
+            link = a.get("href") or ""
+            if not link.startswith("http"):
+                continue
+            title = a.get_text(" ", strip=True)
+            snippet_el = res.select_one(".result__snippet") or res.select_one(".result__body")
+            snippet = snippet_el.get_text(" ", strip=True) if snippet_el else ""
+            results.append({"title": title, "url": link, "snippet": snippet})
+            if len(results) >= k:
+                break
+        return results
     except Exception:
         return []
 
@@ -141,27 +199,27 @@ def _ddg_post_html(query: str, k: int, timeout: int = 20) -> List[Dict[str, str]
     base = "https://html.duckduckgo.com/html/"
     headers = {"User-Agent": UA, "Accept-Language": "en-US,en;q=0.8"}
     try:
-        with httpx.Client(timeout=timeout, headers=headers) as client:
-            r = client.post(base, data={"q": query})
-            r.raise_for_status()
-            soup = _soup(r.text)
-            if not soup:
-                return []
-            results: List[Dict[str, str]] = []
-            for res in soup.select("div.result"):
-                a = res.select_one("a.result__a") or res.select_one("a[href]")
-                if not a:
-                    continue
-                link = a.get("href") or ""
-                if not link.startswith("http"):
-                    continue
-                title = a.get_text(" ", strip=True)
-                snippet_el = res.select_one(".result__snippet") or res.select_one(".result__body")
-                snippet = snippet_el.get_text(" ", strip=True) if snippet_el else ""
-                results.append({"title": title, "url": link, "snippet": snippet})
-                if len(results) >= k:
-                    break
-            return results
+        client = _http()
+        r = client.post(base, data={"q": query}, timeout=timeout, headers=headers)
+        r.raise_for_status()
+        soup = _soup(r.text)
+        if not soup:
+            return []
+        results: List[Dict[str, str]] = []
+        for res in soup.select("div.result"):
+            a = res.select_one("a.result__a") or res.select_one("a[href]")
+            if not a:
+                continue
+            link = a.get("href") or ""
+            if not link.startswith("http"):
+                continue
+            title = a.get_text(" ", strip=True)
+            snippet_el = res.select_one(".result__snippet") or res.select_one(".result__body")
+            snippet = snippet_el.get_text(" ", strip=True) if snippet_el else ""
+            results.append({"title": title, "url": link, "snippet": snippet})
+            if len(results) >= k:
+                break
+        return results
     except Exception:
         return []
 
@@ -169,10 +227,10 @@ def _wikipedia_opensearch(query: str, k: int, timeout: int = 10) -> List[Dict[st
     api = "https://en.wikipedia.org/w/api.php"
     params = {"action": "opensearch", "search": query, "limit": str(k), "namespace": "0", "format": "json"}
     try:
-        with httpx.Client(timeout=timeout, headers={"User-Agent": UA}) as client:
-            r = client.get(api, params=params)
-            r.raise_for_status()
-            data = r.json()
+        client = _http()
+        r = client.get(api, params=params, timeout=timeout, headers={"User-Agent": UA})
+        r.raise_for_status()
+        data = r.json()
         titles = data[1] if len(data) > 1 else []
         descs  = data[2] if len(data) > 2 else []
         urls   = data[3] if len(data) > 3 else []
@@ -196,37 +254,50 @@ def _static_seed(query: str, k: int) -> List[Dict[str, str]]:
 # ---------- Plain implementations ----------
 def web_search_impl(query: str, k: int = 3) -> List[Dict[str, str]]:
     k = max(1, min(int(k or 3), 10))  # smaller by default
+    key = ("search", query, k)
+    cached = _CACHE.get(key)
+    if cached is not None:
+        return cached
     for layer in (
         lambda: _tavily_search(query, k),
         lambda: _ddg_get(query, k),
         lambda: _ddg_post_html(query, k),
         lambda: _wikipedia_opensearch(query, k),
-        lambda: _static_seed(query, k),
     ):
         res = layer()
         if res:
+            _CACHE.put(key, res)
             return res
     return _static_seed(query, k)
 
 def fetch_url_impl(url: str) -> str:
     if not url or not url.lower().startswith(("http://", "https://")):
         return ""
+    cached = _CACHE.get(("fetch", url))
+    if cached is not None:
+        return cached
+    text = _fetch_uncached(url)
+    if not text.startswith("[fetch_error]"):
+        _CACHE.put(("fetch", url), text)
+    return text
+
+def _fetch_uncached(url: str) -> str:
     headers = {"User-Agent": UA, "Accept": "*/*", "Accept-Language": "en-US,en;q=0.8"}
     try:
-        with httpx.Client(follow_redirects=True, timeout=45, headers=headers) as client:
-            resp = client.get(url)
-            resp.raise_for_status()
-            content = resp.content
-            if _is_pdf_response(resp, url, content):
-                text = _extract_text_from_pdf_bytes(content)
-                if not text:
-                    # mis-labeled PDF; try as HTML
-                    html = content.decode(resp.encoding or "utf-8", errors="ignore")
-                    return _truncate(_extract_text_from_html(html, url))
-                return _truncate(text)
-            # HTML / other
-            html = content.decode(resp.encoding or "utf-8", errors="ignore")
-            return _truncate(_extract_text_from_html(html, url))
+        client = _http()
+        resp = client.get(url, follow_redirects=True, timeout=45, headers=headers)
+        resp.raise_for_status()
+        content = resp.content
+        if _is_pdf_response(resp, url, content):
+            text = _extract_text_from_pdf_bytes(content)
+            if not text:
+                # mis-labeled PDF; try as HTML
+                html = content.decode(resp.encoding or "utf-8", errors="ignore")
+                return _truncate(_extract_text_from_html(html, url))
+            return _truncate(text)
+        # HTML / other
+        html = content.decode(resp.encoding or "utf-8", errors="ignore")
+        return _truncate(_extract_text_from_html(html, url))
     except Exception as e:
         return f"[fetch_error] {e}"
 
@@ -235,13 +306,17 @@ def citation_check_impl(claims_markdown: str, urls: List[str]) -> str:
     return f"[check] received {len(uniq)} URLs; deeper verification to follow."
 
 # ---------- Tool wrappers ----------
+# Network-bound tools run in a worker thread so concurrent runs don't block the event loop.
 @function_tool()
-def web_search(query: str, k: int = 3) -> List[Dict[str, str]]:
-    return web_search_impl(query, k)
+async def web_search(query: str, k: int = 3) -> List[Dict[str, str]]:
+    return await asyncio.to_thread(web_search_impl, query, k)
 
 @function_tool()
-def fetch_url(url: str) -> str:
-    return fetch_url_impl(url)
+async def fetch_url(url: str) -> str:
+    budget = current_budget()
+    if budget is not None and not budget.try_fetch():
+        return "[budget] fetch limit reached for this run; answer from the sources you already have."
+    return await asyncio.to_thread(fetch_url_impl, url)
 
 @function_tool()
 def citation_check(claims_markdown: str, urls: List[str]) -> str: